@@ -1,8 +1,23 @@
 import os
+import sys
 import json
-from collections import defaultdict
 import pandas as pd
 
+# orjson parses the large WLASL/MSASL files several times faster than the
+# stdlib; its JSONDecodeError subclasses json.JSONDecodeError.
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# ijson streams array items one at a time instead of building the whole object graph
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+JSON_DECODE_ERRORS = (json.JSONDecodeError,) if ijson is None else (json.JSONDecodeError, ijson.JSONError)
+
 # --- Configuration ---
 # IMPORTANT: Update these paths to the correct locations on your system
 WLASL_DIR = '/home/pandu/.cache/kagglehub/datasets/risangbaskoro/wlasl-processed/versions/5'
@@ -13,6 +28,18 @@ MSASL_TRAIN_FILE = os.path.join(MSASL_DIR, 'MSASL_train.json')
 MSASL_VAL_FILE = os.path.join(MSASL_DIR, 'MSASL_val.json')
 MSASL_TEST_FILE = os.path.join(MSASL_DIR, 'MSASL_test.json')
 
+def iter_json_items(filepath):
+    """Yields the items of a top-level JSON array, streaming with ijson when available."""
+    with open(filepath, 'rb') as f:
+        if ijson is not None:
+            yield from ijson.items(f, 'item', use_float=True)
+        else:
+            yield from json_loads(f.read())
+
+def intern_or_none(value):
+    """Interns repeated short strings (labels, split names); other values pass through."""
+    return sys.intern(value) if isinstance(value, str) else value
+
 # Check if directories exist
 if not os.path.isdir(WLASL_DIR):
     print(f"Error: WLASL directory not found at {WLASL_DIR}")
@@ -21,43 +48,10 @@ if not os.path.isdir(MSASL_DIR):
     print(f"Error: MS-ASL directory not found at {MSASL_DIR}")
     exit()
 
-# --- Step 1: Load WLASL data and extract URLs ---
-print(f"Loading WLASL data from: {WLASL_JSON_FILE}")
-wlasl_urls_set = set()
-# Store details: url -> list of (gloss, video_id) tuples
-wlasl_url_details = defaultdict(list)
-
-try:
-    with open(WLASL_JSON_FILE, 'r') as f:
-        wlasl_data = json.load(f)
-
-    print("Extracting WLASL URLs...")
-    wlasl_instance_count = 0
-    for entry in wlasl_data:
-        gloss = entry.get('gloss')
-        for instance in entry.get('instances', []):
-            wlasl_instance_count += 1
-            url = instance.get('url')
-            video_id = instance.get('video_id')
-            if url: # Check if URL is not None or empty
-                wlasl_urls_set.add(url)
-                wlasl_url_details[url].append({'gloss': gloss, 'video_id': video_id, 'split': instance.get('split')})
-
-    print(f"Found {len(wlasl_urls_set)} unique URLs from {wlasl_instance_count} instances in WLASL.")
-
-except FileNotFoundError:
-    print(f"Error: WLASL JSON file not found at {WLASL_JSON_FILE}")
-    exit()
-except json.JSONDecodeError:
-    print(f"Error: Could not decode JSON from {WLASL_JSON_FILE}")
-    exit()
-except Exception as e:
-    print(f"An error occurred while processing WLASL data: {e}")
-    exit()
-
-# --- Step 2: Load MS-ASL data ---
-print("\nLoading MS-ASL data...")
-msasl_data = []
+# --- Step 1: Load MS-ASL data ---
+print("Loading MS-ASL data...")
+# All three splits are gathered into one column-wise batch; only the fields used for matching are kept
+msasl_columns = {'url': [], 'clean_text': [], 'text': [], 'label': [], 'msasl_split': []}
 msasl_files = {
     'train': MSASL_TRAIN_FILE,
     'val': MSASL_VAL_FILE,
@@ -71,18 +65,24 @@ for split, filepath in msasl_files.items():
         if not os.path.exists(filepath):
             print(f"Warning: MS-ASL file not found at {filepath}. Skipping.")
             continue
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            for item in data:
-                item['msasl_split'] = split # Add split info to each item
-            msasl_data.extend(data)
-            total_msasl_instances += len(data)
-            print(f"Loaded {len(data)} instances from {split} split.")
+        split_columns = {'url': [], 'clean_text': [], 'text': [], 'label': []}
+        for item in iter_json_items(filepath):
+            split_columns['url'].append(item.get('url'))
+            # Labels repeat across many items; intern them so duplicates share one object
+            split_columns['clean_text'].append(intern_or_none(item.get('clean_text')))
+            split_columns['text'].append(intern_or_none(item.get('text')))
+            split_columns['label'].append(item.get('label'))
+        split_count = len(split_columns['url'])
+        for key, values in split_columns.items():
+            msasl_columns[key].extend(values)
+        msasl_columns['msasl_split'].extend([split] * split_count) # Add split info to each item
+        total_msasl_instances += split_count
+        print(f"Loaded {split_count} instances from {split} split.")
     except FileNotFoundError:
          print(f"Error: MS-ASL JSON file not found at {filepath}")
          # Decide if you want to exit or continue without this split
          # exit()
-    except json.JSONDecodeError:
+    except JSON_DECODE_ERRORS:
         print(f"Error: Could not decode JSON from {filepath}")
         # exit()
     except Exception as e:
@@ -90,41 +90,70 @@ for split, filepath in msasl_files.items():
         # exit()
 
 print(f"Total MS-ASL instances loaded: {total_msasl_instances}")
-if not msasl_data:
+if not total_msasl_instances:
     print("Error: No MS-ASL data loaded. Exiting.")
     exit()
 
+msasl_df = pd.DataFrame(msasl_columns)
+
+# Only WLASL instances sharing one of these URLs need their details kept
+msasl_urls_set = set(msasl_df['url'].dropna()) - {''}
+
+# --- Step 2: Load WLASL data and extract URLs ---
+print(f"\nLoading WLASL data from: {WLASL_JSON_FILE}")
+wlasl_urls_set = set()
+# Flattened WLASL instances whose URL also appears in MS-ASL, joined against MS-ASL later
+wlasl_columns = {'url': [], 'wlasl_gloss': [], 'wlasl_video_id': [], 'wlasl_split': []}
+
+try:
+    print("Extracting WLASL URLs...")
+    wlasl_instance_count = 0
+    for entry in iter_json_items(WLASL_JSON_FILE):
+        gloss = entry.get('gloss')
+        for instance in entry.get('instances', []):
+            wlasl_instance_count += 1
+            url = instance.get('url')
+            video_id = instance.get('video_id')
+            if url: # Check if URL is not None or empty
+                wlasl_urls_set.add(url)
+                if url in msasl_urls_set:
+                    wlasl_columns['url'].append(url)
+                    wlasl_columns['wlasl_gloss'].append(gloss)
+                    wlasl_columns['wlasl_video_id'].append(video_id)
+                    wlasl_columns['wlasl_split'].append(intern_or_none(instance.get('split')))
+
+    print(f"Found {len(wlasl_urls_set)} unique URLs from {wlasl_instance_count} instances in WLASL.")
+
+except FileNotFoundError:
+    print(f"Error: WLASL JSON file not found at {WLASL_JSON_FILE}")
+    exit()
+except JSON_DECODE_ERRORS:
+    print(f"Error: Could not decode JSON from {WLASL_JSON_FILE}")
+    exit()
+except Exception as e:
+    print(f"An error occurred while processing WLASL data: {e}")
+    exit()
+
 # --- Step 3: Find duplicate URLs ---
 print("\nFinding duplicate URLs between WLASL and MS-ASL...")
-duplicate_videos = []
-checked_msasl_urls = 0
-
-for msasl_item in msasl_data:
-    url = msasl_item.get('url')
-    if url:
-        checked_msasl_urls += 1
-        if url in wlasl_urls_set:
-            # Found a duplicate URL!
-            # Get all WLASL entries associated with this URL
-            wlasl_entries = wlasl_url_details.get(url, [])
-            for wlasl_entry in wlasl_entries:
-                duplicate_entry = {
-                    'url': url,
-                    'wlasl_gloss': wlasl_entry.get('gloss'),
-                    'wlasl_video_id': wlasl_entry.get('video_id'),
-                    'wlasl_split': wlasl_entry.get('split'),
-                    'msasl_text': msasl_item.get('clean_text', msasl_item.get('text')),
-                    'msasl_label': msasl_item.get('label'),
-                    'msasl_split': msasl_item.get('msasl_split') # Use the split we added earlier
-                }
-                duplicate_videos.append(duplicate_entry)
+wlasl_df = pd.DataFrame(wlasl_columns)
+msasl_df = msasl_df[msasl_df['url'].notna() & (msasl_df['url'] != '')]
+checked_msasl_urls = len(msasl_df)
+
+msasl_df = (msasl_df.assign(msasl_text=msasl_df['clean_text'].fillna(msasl_df['text']))
+            .rename(columns={'label': 'msasl_label'}))
+# Pair each MS-ASL item with every WLASL entry sharing its URL. The merge does not preserve
+# row order, so sort on the original positions: MS-ASL order, then WLASL order within an item.
+df_duplicates = (msasl_df[['url', 'msasl_text', 'msasl_label', 'msasl_split']].reset_index(drop=True).reset_index(names='_mpos')
+                 .merge(wlasl_df.reset_index(names='_wpos'), on='url', how='inner')
+                 .sort_values(['_mpos', '_wpos'], kind='stable', ignore_index=True))
+df_duplicates = df_duplicates[['url', 'wlasl_gloss', 'wlasl_video_id', 'wlasl_split', 'msasl_text', 'msasl_label', 'msasl_split']]
 
 print(f"Checked {checked_msasl_urls} URLs from MS-ASL.")
 
 # --- Step 4: Report Results ---
-num_duplicate_entries = len(duplicate_videos)
-unique_duplicate_urls = set(d['url'] for d in duplicate_videos)
-num_unique_duplicate_urls = len(unique_duplicate_urls)
+num_duplicate_entries = len(df_duplicates)
+num_unique_duplicate_urls = df_duplicates['url'].nunique()
 
 print(f"\n--- Results ---")
 print(f"Found {num_duplicate_entries} duplicate video entries based on URL.")
@@ -137,7 +166,6 @@ if num_duplicate_entries > 0:
 
     # Display first few duplicates for inspection
     print("\n--- Sample Duplicate Entries ---")
-    df_duplicates = pd.DataFrame(duplicate_videos)
     print(df_duplicates.head(10).to_string()) # Display first 10 rows without truncation
 
     # Save duplicates to a CSV file for easier analysis (optional)
@@ -149,18 +177,16 @@ if num_duplicate_entries > 0:
         print(f"\nCould not save duplicate list to CSV: {e}")
 
     # Further analysis: Check for split conflicts
-    split_conflicts = []
-    for entry in duplicate_videos:
-        if entry['wlasl_split'] and entry['msasl_split']:
-             # Simple check: if one is train and the other is test or val
-             if (entry['wlasl_split'] == 'train' and entry['msasl_split'] in ['test', 'val']) or \
-                (entry['msasl_split'] == 'train' and entry['wlasl_split'] in ['test', 'val']):
-                 split_conflicts.append(entry)
-
-    print(f"\nFound {len(split_conflicts)} instances with potential train/test(val) split conflicts.")
-    if split_conflicts:
+    # Simple check: if one is train and the other is test or val
+    wlasl_split = df_duplicates['wlasl_split']
+    msasl_split = df_duplicates['msasl_split']
+    conflict_mask = ((wlasl_split == 'train') & msasl_split.isin(['test', 'val'])) | \
+                    ((msasl_split == 'train') & wlasl_split.isin(['test', 'val']))
+    df_conflicts = df_duplicates[conflict_mask]
+
+    print(f"\nFound {len(df_conflicts)} instances with potential train/test(val) split conflicts.")
+    if not df_conflicts.empty:
          print("Sample split conflicts:")
-         df_conflicts = pd.DataFrame(split_conflicts)
          print(df_conflicts.head(5).to_string())
 
 
@@ -1,7 +1,26 @@
 import os
+import sys
 import json
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from tqdm import tqdm 
+
+# orjson parses the large WLASL/MSASL files several times faster than the
+# stdlib; its JSONDecodeError subclasses json.JSONDecodeError.
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# ijson streams array items one at a time instead of building the whole object graph
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+JSON_DECODE_ERRORS = (json.JSONDecodeError,) if ijson is None else (json.JSONDecodeError, ijson.JSONError)
 
 # --- Configuration ---
 WLASL_DATASET_DIR = '/home/pandu/.cache/kagglehub/datasets/risangbaskoro/wlasl-processed/versions/5'
@@ -12,217 +31,303 @@ MSASL_TRAIN_JSON = os.path.join(MSASL_DATASET_DIR, 'MSASL_train.json')
 MSASL_VAL_JSON = os.path.join(MSASL_DATASET_DIR, 'MSASL_val.json')
 MSASL_TEST_JSON = os.path.join(MSASL_DATASET_DIR, 'MSASL_test.json')
 
-OUTPUT_CSV = 'combined_asl.csv'
+# Parquet copies of the instances extracted from each JSON file, reused on reruns
+CACHE_DIR = 'json_cache'
+CACHE_VERSION = 1 # Bump when the cached column layout changes
+
+OUTPUT_PARQUET = 'combined_asl.parquet'
+OUTPUT_CSV = 'combined_asl.csv' # Text copy for CSV-based consumers; set to None to skip
+
+# Columns extracted from the source JSON files, in DataFrame construction order
+SOURCE_COLUMNS = ['category', 'dataset_type', 'url', 'fps', 'frame_start', 'frame_end']
+
+# Keys an instance must carry to be included
+WLASL_REQUIRED_KEYS = frozenset({'url', 'video_id', 'fps', 'frame_start', 'frame_end'})
+MSASL_REQUIRED_KEYS = frozenset({'clean_text', 'url', 'fps', 'start', 'end'})
+
+# Category cleanup: spaces become underscores, '#' is dropped
+CATEGORY_TRANSLATION = str.maketrans({' ': '_', '#': None})
+
+# --- Helper Functions to Stream JSON ---
+def iter_json_items(filepath):
+    """Yields the items of a top-level JSON array, streaming with ijson when available."""
+    with open(filepath, 'rb') as f:
+        if ijson is not None:
+            yield from ijson.items(f, 'item', use_float=True)
+        else:
+            yield from json_loads(f.read())
+
+def cache_tag(extract_columns):
+    """Short hash of the cache version, the extractor's code and the required keys.
+
+    Part of the cache file name, so editing any of them invalidates old caches.
+    """
+    digest = hashlib.sha1(str(CACHE_VERSION).encode())
+    digest.update(extract_columns.__code__.co_code)
+    digest.update(repr(extract_columns.__code__.co_consts).encode())
+    digest.update(repr((sorted(WLASL_REQUIRED_KEYS), sorted(MSASL_REQUIRED_KEYS))).encode())
+    return digest.hexdigest()[:12]
+
+def load_rows(filepath, extract_columns):
+    """Returns (instances as a DataFrame or None on error, log messages) for a JSON file.
+
+    Extracted instances are cached as Parquet in CACHE_DIR and reused while the
+    cache is newer than the source JSON, so reruns skip JSON parsing entirely.
+    Runs in a worker process, so messages are returned for the parent to print.
+    """
+    log = []
+    cache_path = os.path.join(CACHE_DIR, f"{os.path.basename(filepath)}.{cache_tag(extract_columns)}.parquet")
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(filepath):
+            log.append(f"Loading cached instances from: {cache_path}")
+            rows = pd.read_parquet(cache_path)
+            log.append(f" -> Loaded {len(rows)} instances.")
+            return rows, log
+    except OSError:
+        pass # No cache yet (or missing source, reported below)
+    except Exception as e:
+        log.append(f"Warning: Ignoring unreadable cache {cache_path}: {e}")
 
-# --- Helper Function to Load JSON ---
-def load_json(filepath):
-    print(f"Loading JSON data from: {filepath}")
+    log.append(f"Loading JSON data from: {filepath}")
     try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-        print(f" -> Loaded {len(data)} entries.")
-        return data
+        rows = pd.DataFrame(extract_columns(iter_json_items(filepath)))
+        log.append(f" -> Extracted {len(rows)} instances.")
     except FileNotFoundError:
-        print(f"Error: JSON file not found at {filepath}")
-        return None
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from {filepath}")
-        return None
+        log.append(f"Error: JSON file not found at {filepath}")
+        return None, log
+    except JSON_DECODE_ERRORS:
+        log.append(f"Error: Could not decode JSON from {filepath}")
+        return None, log
+    except Exception as e:
+        log.append(f"An unexpected error occurred loading {filepath}: {e}")
+        return None, log
+
+    # Written to a temporary file first, so an interrupted write never leaves a corrupt cache behind
+    tmp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.parquet.tmp')
+        os.close(fd)
+        rows.to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+        os.replace(tmp_path, cache_path)
     except Exception as e:
-        print(f"An unexpected error occurred loading {filepath}: {e}")
-        return None
-
-# --- Load Datasets ---
-wlasl_data = load_json(WLASL_JSON_FILE)
-msasl_train_data = load_json(MSASL_TRAIN_JSON)
-msasl_val_data = load_json(MSASL_VAL_JSON)
-msasl_test_data = load_json(MSASL_TEST_JSON)
-
-# Exit if essential data failed to load
-if wlasl_data is None or msasl_train_data is None or msasl_val_data is None or msasl_test_data is None:
-    print("\nOne or more essential JSON files could not be loaded. Exiting.")
-    exit()
-
-# Combine MSASL splits
-msasl_data = msasl_train_data + msasl_val_data + msasl_test_data
-print(f"\nCombined MSASL data: {len(msasl_data)} entries.")
-
-# --- Process Data into a List of Dictionaries ---
-all_video_data = []
-print("\nProcessing WLASL data...")
-
-# Process WLASL
-for entry in tqdm(wlasl_data, desc="Processing WLASL Glosses"):
-    gloss = entry.get('gloss')
-    if not gloss or not isinstance(entry.get('instances'), list):
-        continue
-
-    # Category is already lowercased here, spaces will be handled later in the DataFrame
-    category = gloss.lower()
-
-    for instance in entry['instances']:
-        required_keys = ['url', 'video_id', 'fps', 'frame_start', 'frame_end']
-        if not all(key in instance for key in required_keys):
+        log.append(f"Warning: Could not write cache {cache_path}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows, log
+
+def new_columns():
+    """One list per DataFrame column, filled in parallel while parsing."""
+    return {col: [] for col in SOURCE_COLUMNS}
+
+def extract_wlasl_rows(entries):
+    columns = new_columns()
+    for entry in entries:
+        gloss = entry.get('gloss')
+        if not gloss or not isinstance(entry.get('instances'), list):
+            continue
+
+        # Category is already lowercased here, spaces will be handled later in the DataFrame
+        category = sys.intern(gloss.lower())
+
+        for instance in entry['instances']:
+            if not WLASL_REQUIRED_KEYS <= instance.keys():
+                continue
+
+            columns['category'].append(category) # Store the lowercased category (with spaces for now)
+            columns['dataset_type'].append('WLASL')
+            columns['url'].append(instance.get('url'))
+            columns['fps'].append(instance.get('fps'))
+            columns['frame_start'].append(instance['frame_start']) # 0-based inclusive
+            columns['frame_end'].append(instance['frame_end'])     # 0-based exclusive
+    return columns
+
+def extract_msasl_rows(items):
+    columns = new_columns()
+    for item in items:
+        if not MSASL_REQUIRED_KEYS <= item.keys():
+             continue
+        if item.get('label') is None: # Although not used directly, good check
+             continue
+
+        frame_start_0based = item['start']
+        frame_end_0based_exclusive = item['end']
+
+        if not isinstance(frame_start_0based, int) or not isinstance(frame_end_0based_exclusive, int):
             continue
 
-        frame_start_orig = instance['frame_start']
-        frame_end_orig = instance['frame_end']
-        frame_start_0based = frame_start_orig
-        frame_end_0based_exclusive = frame_end_orig
-
-        instance_dict = {
-            'category': category, # Store the lowercased category (with spaces for now)
-            'dataset_type': 'WLASL',
-            'url': instance.get('url'),
-            'fps': instance.get('fps'),
-            'frame_start': frame_start_0based,
-            'frame_end': frame_end_0based_exclusive,
-        }
-        all_video_data.append(instance_dict)
-
-print(f"Processed {len(all_video_data)} instances from WLASL.")
-wlasl_count = len(all_video_data)
-
-# Process MSASL
-print("\nProcessing MSASL data...")
-for item in tqdm(msasl_data, desc="Processing MSASL Instances"):
-    required_keys = ['clean_text', 'url', 'fps', 'start', 'end']
-    if not all(key in item for key in required_keys):
-         continue
-    if item.get('label') is None: # Although not used directly, good check
-         continue
-
-    frame_start_0based = item['start']
-    frame_end_0based_exclusive = item['end']
-
-    if not isinstance(frame_start_0based, int) or not isinstance(frame_end_0based_exclusive, int):
-        continue
-
-    instance_dict = {
-        'category': item.get('clean_text', '').lower(), # Store the lowercased category (with spaces for now)
-        'dataset_type': 'MSASL',
-        'url': item.get('url'),
-        'fps': item.get('fps'),
-        'frame_start': frame_start_0based,
-        'frame_end': frame_end_0based_exclusive,
+        columns['category'].append(sys.intern(item.get('clean_text', '').lower())) # Interned: labels repeat across many items
+        columns['dataset_type'].append('MSASL')
+        columns['url'].append(item.get('url'))
+        columns['fps'].append(item.get('fps'))
+        columns['frame_start'].append(frame_start_0based)
+        columns['frame_end'].append(frame_end_0based_exclusive)
+    return columns
+
+# --- Main Execution Logic ---
+
+def main():
+    # --- Load and Process Datasets ---
+    # Files are streamed one item at a time, so only the extracted fields are kept in memory.
+    # The four files are independent, so each is parsed in its own worker process.
+    print("\nProcessing WLASL and MSASL data...")
+    sources = {
+        'wlasl': (WLASL_JSON_FILE, extract_wlasl_rows),
+        'msasl_train': (MSASL_TRAIN_JSON, extract_msasl_rows),
+        'msasl_val': (MSASL_VAL_JSON, extract_msasl_rows),
+        'msasl_test': (MSASL_TEST_JSON, extract_msasl_rows),
     }
-    all_video_data.append(instance_dict)
-
-msasl_count = len(all_video_data) - wlasl_count
-print(f"Processed {msasl_count} instances from MSASL.")
-print(f"Total instances processed: {len(all_video_data)}")
-
-# --- Create DataFrame ---
-print("\nCreating DataFrame...")
-df = pd.DataFrame(all_video_data)
-
-if df.empty:
-    print("No data was processed. Exiting.")
-    exit()
-
-# --- Format Category Column ---
-print("Formatting category names (lowercase, underscore for spaces, remove '#')...") # Updated print message
-# Ensure string type, apply lowercase, replace spaces, AND remove '#'
-df['category'] = (df['category'].astype(str)
-                  .str.lower()
-                  .str.replace(' ', '_', regex=False)
-                  .str.replace('#', '', regex=False) # <<< ADD THIS PART
-                 )
-# Optional: Use regex=True for more complex whitespace:
-# df['category'] = (df['category'].astype(str)
-#                   .str.lower()
-#                   .str.replace(r'\s+', '_', regex=True)
-#                   .str.replace('#', '', regex=False) # Add hash removal here too if using regex for spaces
-#                  )
-
-
-# --- Add and Populate Columns ---
-
-# 1. Generate unique 'id'
-df.reset_index(inplace=True)
-df.rename(columns={'index': 'id'}, inplace=True)
-
-# 2. Generate 'filename' based on 'id'
-df['filename'] = df['id'].astype(str) + '.mp4'
-
-# 3. Add placeholder columns
-df['dataset_split'] = None
-df['is_valid'] = None
-df['is_duplicate'] = None # Using None as requested
-
-# --- Final DataFrame Structure ---
-# Define desired column order (category_num removed)
-final_columns = [
-    'id',
-    'category',        # Now lowercase with underscores
-    'dataset_type',    # WLASL or MSASL
-    'url',
-    'frame_start',     # 0-based inclusive start frame index
-    'frame_end',       # 0-based exclusive end frame index (-1 for end of video)
-    'fps',
-    'filename',        # Proposed filename (e.g., {id}.mp4)
-    'dataset_split',   # To be populated later (train/val/test)
-    'is_valid',        # To be populated after download/cut (True/False/None)
-    'is_duplicate',    # To be populated after checking URLs (True/False/None)
-]
-
-# Ensure all desired columns exist
-for col in final_columns:
-    if col not in df.columns:
-        df[col] = None # Add if missing
-
-# Reorder DataFrame
-df = df[final_columns]
-
-# Populate is_duplicate column
-df['is_duplicate'] = df.duplicated(subset=['url', 'category', 'frame_start', 'frame_end'], keep='first')
-
-uniqueness_dict = {}
-
-# Populate dict with WLASL first
-for _, row in df.iterrows():
-    if row["dataset_type"] == 'WLASL':
-        key = f"WLASL-{row['category']}-{row['url']}"
-        uniqueness_dict[key] = uniqueness_dict.get(key, 0) + 1
-
-# Check MSASL against WLASL
-for index, row in df.iterrows():
-    if row["dataset_type"] == 'MSASL' and row["is_duplicate"] == False:
-        key = f"WLASL-{row['category']}-{row['url']}"
-        if uniqueness_dict.get(key, 0) > 0:
-            df.at[index, 'is_duplicate'] = True
-
-msasl_total = df[df['dataset_type'] == 'MSASL'].shape[0]
-print(f"Total number of MSASL data: {msasl_total}")
-wlasl_total = df[df['dataset_type'] == 'WLASL'].shape[0]
-print(f"Total number of MSASL data: {wlasl_total}")
-youtube_count = df[(df['dataset_type'] == 'WLASL') & (df['url'].str.contains('youtube', case=False, na=False))].shape[0]
-print(f"Number of youtube occorance on WLASL: {youtube_count}")
-youtube_count_msasl = df[(df['dataset_type'] == 'MSASL') & (df['url'].str.contains('youtube', case=False, na=False))].shape[0]
-print(f"Number of youtube occorance on MSASL: {youtube_count_msasl}")
-# --- Display Info and Save ---
-print("\n--- Combined DataFrame Info ---")
-df.info()
-
-print("\n--- DataFrame Head ---")
-print(df.head())
-
-print("Number of row with is_duplicate==False")
-count = df[df["is_duplicate"] == False].shape[0]
-print(f"Count: {count}")
-
-print("\n--- Value Counts ---")
-print("Dataset Type:")
-print(df['dataset_type'].value_counts())
-print("\nTop 10 Categories (Formatted):")
-print(df['category'].value_counts().head(10)) # Will now show formatted names
-
-# Save the DataFrame
-print(f"\nSaving DataFrame to: {OUTPUT_CSV}")
-try:
-    df.to_csv(OUTPUT_CSV, index=False)
-    print("DataFrame saved successfully.")
-except Exception as e:
-    print(f"Error saving DataFrame: {e}")
+    with ProcessPoolExecutor(max_workers=len(sources)) as executor:
+        futures = {name: executor.submit(load_rows, path, extract) for name, (path, extract) in sources.items()}
+        loaded = {}
+        for name, future in futures.items():
+            # Print each source's messages together once its worker is done
+            loaded[name], log = future.result()
+            print("\n".join(log))
+    wlasl_rows = loaded['wlasl']
+    msasl_train_rows = loaded['msasl_train']
+    msasl_val_rows = loaded['msasl_val']
+    msasl_test_rows = loaded['msasl_test']
+
+    # Exit if essential data failed to load
+    if wlasl_rows is None or msasl_train_rows is None or msasl_val_rows is None or msasl_test_rows is None:
+        print("\nOne or more essential JSON files could not be loaded. Exiting.")
+        return
+
+    wlasl_count = len(wlasl_rows)
+    msasl_count = len(msasl_train_rows) + len(msasl_val_rows) + len(msasl_test_rows)
+    print(f"\nProcessed {wlasl_count} instances from WLASL.")
+    print(f"Processed {msasl_count} instances from MSASL.")
+    print(f"Total instances processed: {wlasl_count + msasl_count}")
+
+    # --- Create DataFrame ---
+    print("\nCreating DataFrame...")
+    df = pd.concat([wlasl_rows, msasl_train_rows, msasl_val_rows, msasl_test_rows], ignore_index=True)
+
+    if df.empty:
+        print("No data was processed. Exiting.")
+        return
+
+    # Narrow numeric columns; frame indices and fps comfortably fit in 32 bits
+    df = df.astype({'frame_start': 'int32', 'frame_end': 'int32', 'fps': 'float32'})
+
+    # --- Format Category Column ---
+    print("Formatting category names (lowercase, underscore for spaces, remove '#')...") # Updated print message
+    # Ensure string type, apply lowercase, then replace spaces AND remove '#' in a single pass
+    df['category'] = (df['category'].astype(str)
+                      .str.lower()
+                      .str.translate(CATEGORY_TRANSLATION)
+                     )
+    # Optional: Use regex=True for more complex whitespace:
+    # df['category'] = (df['category'].astype(str)
+    #                   .str.lower()
+    #                   .str.replace(r'\s+', '_', regex=True)
+    #                   .str.replace('#', '', regex=False) # Add hash removal here too if using regex for spaces
+    #                  )
+
+    # Few distinct values relative to rows: store as categoricals so comparisons,
+    # duplicated() and value_counts() work on integer codes
+    df['category'] = df['category'].astype('category')
+    df['dataset_type'] = df['dataset_type'].astype('category')
+
+
+    # --- Add and Populate Columns ---
+
+    # 1. Generate unique 'id'
+    df.insert(0, 'id', np.arange(len(df), dtype=np.int32))
+
+    # 'filename' ({id}.mp4) is not stored; it is derived from 'id' when writing the CSV
+
+    # 2. Add placeholder columns
+    # Typed from the start so later masks and assignments stay off the object-dtype path
+    df['dataset_split'] = pd.Categorical([None] * len(df), categories=['train', 'val', 'test'])
+    df['is_valid'] = pd.array([pd.NA] * len(df), dtype='boolean') # Nullable: unknown until download/cut
+    df['is_duplicate'] = np.zeros(len(df), dtype=bool)
+
+    # --- Final DataFrame Structure ---
+    # Define desired column order (category_num removed)
+    final_columns = [
+        'id',
+        'category',        # Now lowercase with underscores
+        'dataset_type',    # WLASL or MSASL
+        'url',
+        'frame_start',     # 0-based inclusive start frame index
+        'frame_end',       # 0-based exclusive end frame index (-1 for end of video)
+        'fps',
+        'dataset_split',   # To be populated later (train/val/test)
+        'is_valid',        # To be populated after download/cut (True/False/None)
+        'is_duplicate',    # To be populated after checking URLs (True/False/None)
+    ]
+
+    # Ensure all desired columns exist
+    for col in final_columns:
+        if col not in df.columns:
+            df[col] = None # Add if missing
+
+    # Reorder DataFrame
+    df = df[final_columns]
+
+    # CSV layout keeps the proposed filename (e.g., {id}.mp4) right after 'fps'
+    csv_columns = final_columns[:final_columns.index('fps') + 1] + ['filename'] + final_columns[final_columns.index('fps') + 1:]
+
+    # Populate is_duplicate column:
+    # exact repeats within the combined data, plus MSASL rows whose (category, url)
+    # pair already exists in WLASL
+    exact_dup_mask = df.duplicated(subset=['url', 'category', 'frame_start', 'frame_end'], keep='first')
+    is_wlasl = df['dataset_type'] == 'WLASL'
+    category_values = df['category'].to_numpy()
+    url_values = df['url'].to_numpy()
+    is_wlasl_values = is_wlasl.to_numpy()
+    wlasl_keys = set(zip(category_values[is_wlasl_values], url_values[is_wlasl_values]))
+    row_keys = pd.Series(list(zip(category_values, url_values)), index=df.index)
+    cross_dataset_mask = (df['dataset_type'] == 'MSASL') & row_keys.isin(wlasl_keys)
+    df['is_duplicate'] = exact_dup_mask | cross_dataset_mask
+
+    msasl_total = df[df['dataset_type'] == 'MSASL'].shape[0]
+    print(f"Total number of MSASL data: {msasl_total}")
+    wlasl_total = df[df['dataset_type'] == 'WLASL'].shape[0]
+    print(f"Total number of MSASL data: {wlasl_total}")
+    is_youtube = df['url'].str.contains('youtube', case=False, regex=False, na=False)
+    youtube_count = (is_youtube & (df['dataset_type'] == 'WLASL')).sum()
+    print(f"Number of youtube occorance on WLASL: {youtube_count}")
+    youtube_count_msasl = (is_youtube & (df['dataset_type'] == 'MSASL')).sum()
+    print(f"Number of youtube occorance on MSASL: {youtube_count_msasl}")
+    # --- Display Info and Save ---
+    print("\n--- Combined DataFrame Info ---")
+    df.info()
+
+    print("\n--- DataFrame Head ---")
+    print(df.head())
+
+    print("Number of row with is_duplicate==False")
+    count = (~df['is_duplicate']).sum()
+    print(f"Count: {count}")
+
+    print("\n--- Value Counts ---")
+    print("Dataset Type:")
+    print(df['dataset_type'].value_counts())
+    print("\nTop 10 Categories (Formatted):")
+    print(df['category'].value_counts().head(10)) # Will now show formatted names
+
+    # Save the DataFrame (Parquet is the primary output; CSV is kept for text-based consumers)
+    print(f"\nSaving DataFrame to: {OUTPUT_PARQUET}")
+    try:
+        df.to_parquet(OUTPUT_PARQUET, engine='pyarrow', compression='zstd', index=False)
+        print("DataFrame saved successfully.")
+    except Exception as e:
+        print(f"Error saving DataFrame: {e}")
+
+    if OUTPUT_CSV:
+        print(f"Saving DataFrame to: {OUTPUT_CSV}")
+        try:
+            csv_df = df.assign(filename=df['id'].astype(str) + '.mp4')[csv_columns]
+            csv_df.to_csv(OUTPUT_CSV, index=False)
+            print("DataFrame saved successfully.")
+        except Exception as e:
+            print(f"Error saving DataFrame: {e}")
+
+    print("\n--- DataFrame Creation Complete ---")
+
 
-print("\n--- DataFrame Creation Complete ---")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
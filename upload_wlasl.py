@@ -1,36 +1,78 @@
 import os
 import json
-import random
-import math
+import time
+import asyncio
+import threading
 import mimetypes
-from collections import defaultdict
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+import httplib2
 import numpy as np
 from tqdm import tqdm # For progress bars
 
+# ijson streams the gloss entries one at a time instead of loading the whole file
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
 
 # --- Configuration ---
 DATASET_DIR = '/home/pandu/.cache/kagglehub/datasets/risangbaskoro/wlasl-processed/versions/5'
 JSON_FILE = os.path.join(DATASET_DIR, 'WLASL_v0.3.json')
 VIDEO_DIR = os.path.join(DATASET_DIR, 'videos')
+VIDEO_MIME_TYPE = 'video/mp4' # Every uploaded file is a WLASL .mp4
 CREDENTIALS_FILE = 'credentials.json' # Assumed to be in the same dir as script
 TOKEN_FILE = 'token.json'             # Will be created after first auth
+HTTP_CACHE_DIR = '.http_cache'        # httplib2 response cache for Drive API calls
 
 # Google Drive Configuration
 DRIVE_BASE_FOLDER_NAME = 'SLTA_DATASET'
 SPLIT_NAMES = ['TRAIN', 'VAL', 'TEST']
 TRAIN_RATIO = 0.75
 VAL_RATIO = 0.15
-TEST_RATIO = 0.10 # Adjusted slightly to ensure sum <= 1.0
+TEST_RATIO = 0.10 # Not used directly: test takes whatever train and val leave over
+# Changing the seed (or the split method) reassigns videos to different splits. Files a previous
+# run uploaded are detected across all split folders and not uploaded again, so they stay in
+# their old split; wipe DRIVE_BASE_FOLDER_NAME first for a clean tree with the new assignment.
+SPLIT_SEED = 42
+GLOSS_NAME_TRANSLATION = str.maketrans({'/': '_', '\\': '_'}) # Basic sanitization for folder names
+
+# Uploads go straight to the Drive REST endpoint, several at a time
+DRIVE_UPLOAD_URL = 'https://www.googleapis.com/upload/drive/v3/files'
+MAX_CONCURRENT_UPLOADS = 16
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5) # Refresh this long before the access token expires
+DRIVE_BATCH_SIZE = 100 # Max calls per Drive batch request
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024  # Larger files use a resumable upload session
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024 # Must be a multiple of 256 KiB
+MAX_BATCH_RETRIES = 4 # Re-batches of rate-limited folder creates
+MAX_UPLOAD_RETRIES = 4 # Retries for 5xx/network errors, only for uploads with a pre-generated file ID
+GENERATE_IDS_BATCH = 1000 # Max IDs per files().generateIds call
+RATE_LIMIT_REASONS = frozenset({'rateLimitExceeded', 'userRateLimitExceeded'}) # 403 reasons that are worth retrying
 
 # Google API Scopes (Ensure Drive write access)
 SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+JSON_DECODE_ERRORS = (json.JSONDecodeError,) if ijson is None else (json.JSONDecodeError, ijson.JSONError)
+
+# --- Data Loading Helper Functions ---
+
+def iter_json_items(filepath):
+    """Yields the items of a top-level JSON array, streaming with ijson when available."""
+    with open(filepath, 'rb') as f:
+        if ijson is not None:
+            yield from ijson.items(f, 'item', use_float=True)
+        else:
+            yield from json.load(f)
+
 # --- Google Drive Helper Functions ---
 
 def authenticate():
@@ -62,126 +104,465 @@ def authenticate():
             flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
             creds = flow.run_local_server(port=0)
 
-        with open(TOKEN_FILE, "w") as token:
-            token.write(creds.to_json())
+        save_token(creds)
         print(f"Credentials saved to {TOKEN_FILE}")
 
     return creds
 
-def get_or_create_folder(service, folder_name, parent_id=None):
-    """Finds a folder by name or creates it if it doesn't exist."""
-    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
+def build_drive_service(creds):
+    """Builds a Drive service on its own caching httplib2 connection."""
+    # Cacheable responses are served from HTTP_CACHE_DIR instead of re-fetched
+    authed_http = AuthorizedHttp(creds, http=httplib2.Http(cache=HTTP_CACHE_DIR))
+    return build("drive", "v3", http=authed_http, cache_discovery=False)
+
+_thread_local = threading.local()
+
+def get_thread_service(creds):
+    """Returns this thread's Drive service; httplib2 connections must not be shared across threads."""
+    if not hasattr(_thread_local, 'service'):
+        _thread_local.service = build_drive_service(creds)
+    return _thread_local.service
+
+def create_folder(service, folder_name, parent_id=None):
+    """Creates a folder without checking whether it already exists."""
+    print(f"Creating folder: '{folder_name}'" + (f" inside parent ID {parent_id}" if parent_id else " in root"))
+    file_metadata = {
+        'name': folder_name,
+        'mimeType': 'application/vnd.google-apps.folder'
+    }
     if parent_id:
-        query += f" and '{parent_id}' in parents"
-    else:
-        # Search in root if no parent specified (though we usually will specify)
-        query += " and 'root' in parents"
-    query += " and trashed=false"
+        file_metadata['parents'] = [parent_id]
 
     try:
-        response = service.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
-        files = response.get('files', [])
-        if files:
-            print(f"Found existing folder: '{folder_name}' (ID: {files[0].get('id')})")
-            return files[0].get('id')
-        else:
-            print(f"Creating folder: '{folder_name}'" + (f" inside parent ID {parent_id}" if parent_id else " in root"))
-            file_metadata = {
-                'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            if parent_id:
-                file_metadata['parents'] = [parent_id]
-
-            folder = service.files().create(body=file_metadata, fields='id').execute()
-            print(f"Created folder '{folder_name}' with ID: {folder.get('id')}")
-            return folder.get('id')
+        folder = service.files().create(body=file_metadata, fields='id').execute()
+        print(f"Created folder '{folder_name}' with ID: {folder.get('id')}")
+        return folder.get('id')
     except HttpError as error:
-        print(f"An error occurred finding/creating folder '{folder_name}': {error}")
+        print(f"An error occurred creating folder '{folder_name}': {error}")
         return None
     except Exception as e:
-         print(f"An unexpected error occurred finding/creating folder '{folder_name}': {e}")
+         print(f"An unexpected error occurred creating folder '{folder_name}': {e}")
          return None
 
-def upload_file_to_folder(service, local_path, parent_folder_id, drive_filename=None):
-    """Uploads a single file to a specific Google Drive folder."""
-    if not os.path.exists(local_path):
-        print(f"Error: Local file not found: '{local_path}'")
+def find_folder(service, folder_name, parent_id='root'):
+    """Returns the ID of a folder by name inside parent_id, or None if there is none.
+
+    API errors are left to the caller, so a failed lookup is never mistaken for a missing folder.
+    """
+    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and '{parent_id}' in parents and trashed=false"
+    response = service.files().list(q=query, spaces='drive', pageSize=1, fields='files(id)').execute()
+    files = response.get('files', [])
+    return files[0].get('id') if files else None
+
+def list_child_folders(service, parent_id):
+    """Returns {name: id} for all folders directly inside parent_id, using one paginated query."""
+    query = f"'{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
+    folders = {}
+    page_token = None
+    try:
+        while True:
+            response = service.files().list(
+                q=query,
+                spaces='drive',
+                pageSize=1000,
+                fields='nextPageToken, files(id, name)',
+                pageToken=page_token
+            ).execute()
+            for folder in response.get('files', []):
+                folders.setdefault(folder['name'], folder['id']) # Keep the first match, like find_folder
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return folders
+    except HttpError as error:
+        print(f"An error occurred listing folders in parent ID {parent_id}: {error}")
         return None
+    except Exception as e:
+         print(f"An unexpected error occurred listing folders in parent ID {parent_id}: {e}")
+         return None
+
+def create_folders_batch(service, folder_names, parent_id):
+    """Creates several folders under parent_id using batched requests; returns {name: id} for successes.
+
+    Creates rejected by Drive's rate limit are re-batched with exponential backoff.
+    """
+    created = {}
+    pending = list(range(len(folder_names)))
+
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        rate_limited = []
+
+        def on_created(request_id, response, exception):
+            index = int(request_id)
+            if exception is None:
+                created[folder_names[index]] = response.get('id')
+            elif (attempt < MAX_BATCH_RETRIES and isinstance(exception, HttpError)
+                  and is_rate_limited(exception.resp.status, exception.content)):
+                rate_limited.append(index)
+            else:
+                print(f"An error occurred creating folder '{folder_names[index]}': {exception}")
+
+        for start in range(0, len(pending), DRIVE_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=on_created)
+            for index in pending[start:start + DRIVE_BATCH_SIZE]:
+                file_metadata = {
+                    'name': folder_names[index],
+                    'mimeType': 'application/vnd.google-apps.folder',
+                    'parents': [parent_id]
+                }
+                batch.add(service.files().create(body=file_metadata, fields='id'), request_id=str(index))
+            try:
+                batch.execute()
+            except HttpError as error:
+                print(f"An error occurred creating a batch of folders in parent ID {parent_id}: {error}")
+            except Exception as e:
+                print(f"An unexpected error occurred creating a batch of folders in parent ID {parent_id}: {e}")
+
+        if not rate_limited:
+            break
+        print(f"Rate limited creating {len(rate_limited)} folders; retrying in {2 ** attempt}s...")
+        time.sleep(2 ** attempt) # Exponential backoff
+        pending = sorted(rate_limited)
+
+    print(f"Created {len(created)} of {len(folder_names)} folders inside parent ID {parent_id}")
+    return created
+
+def list_files_batch(service, folder_ids):
+    """Returns ({folder_id: {file names}}, {folder IDs that could not be fully listed}).
+
+    Folders are listed in batched, paginated requests; calls rejected by Drive's
+    rate limit are re-batched with exponential backoff.
+    """
+    file_names = {folder_id: set() for folder_id in folder_ids}
+    failed_folder_ids = set()
+    pending = deque((folder_id, None) for folder_id in folder_ids) # (folder_id, page token)
+    retries = 0
+
+    while pending:
+        rate_limited = []
+
+        def on_listed(request_id, response, exception):
+            folder_id, page_token = batch_requests[int(request_id)]
+            if exception is None:
+                file_names[folder_id].update(f['name'] for f in response.get('files', []))
+                if response.get('nextPageToken'):
+                    pending.append((folder_id, response['nextPageToken']))
+            elif (retries < MAX_BATCH_RETRIES and isinstance(exception, HttpError)
+                  and is_rate_limited(exception.resp.status, exception.content)):
+                rate_limited.append((folder_id, page_token))
+            else:
+                print(f"An error occurred listing files in folder ID {folder_id}: {exception}")
+                failed_folder_ids.add(folder_id)
+
+        while pending:
+            batch = service.new_batch_http_request(callback=on_listed)
+            batch_requests = []
+            while pending and len(batch_requests) < DRIVE_BATCH_SIZE:
+                folder_id, page_token = pending.popleft()
+                batch.add(service.files().list(
+                    q=f"'{folder_id}' in parents and trashed=false",
+                    spaces='drive',
+                    pageSize=1000,
+                    fields='nextPageToken, files(name)',
+                    pageToken=page_token
+                ), request_id=str(len(batch_requests)))
+                batch_requests.append((folder_id, page_token))
+            try:
+                batch.execute()
+            except HttpError as error:
+                print(f"An error occurred listing a batch of folders: {error}")
+                failed_folder_ids.update(folder_id for folder_id, _ in batch_requests)
+            except Exception as e:
+                print(f"An unexpected error occurred listing a batch of folders: {e}")
+                failed_folder_ids.update(folder_id for folder_id, _ in batch_requests)
+
+        if rate_limited:
+            print(f"Rate limited listing {len(rate_limited)} folders; retrying in {2 ** retries}s...")
+            time.sleep(2 ** retries) # Exponential backoff
+            retries += 1
+            pending.extend(rate_limited)
 
+    return file_names, failed_folder_ids
+
+def generate_file_ids(service, count):
+    """Pre-generates Drive file IDs; returns as many as could be generated (possibly fewer than count)."""
+    file_ids = []
+    try:
+        while len(file_ids) < count:
+            response = service.files().generateIds(
+                count=min(GENERATE_IDS_BATCH, count - len(file_ids)),
+                space='drive',
+                type='files'
+            ).execute()
+            file_ids.extend(response.get('ids', []))
+    except HttpError as error:
+        print(f"An error occurred generating file IDs: {error}")
+    except Exception as e:
+        print(f"An unexpected error occurred generating file IDs: {e}")
+    return file_ids
+
+def save_token(creds):
+    with open(TOKEN_FILE, "w") as token:
+        token.write(creds.to_json())
+
+async def keep_token_fresh(creds, token_lock):
+    """Background task: refreshes the access token shortly before it expires.
+
+    Keeps long upload runs from stalling on a 401 + inline refresh.
+    """
+    while creds.expiry is not None:
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        await asyncio.sleep(max(0.0, (creds.expiry - TOKEN_REFRESH_MARGIN - now).total_seconds()))
+        async with token_lock:
+            try:
+                await asyncio.to_thread(creds.refresh, Request())
+                await asyncio.to_thread(save_token, creds)
+            except Exception as e:
+                print(f"\nError refreshing token in background: {e}")
+                return # Uploads still refresh on a 401
+
+async def refresh_token(creds, token_lock, rejected_token):
+    """Refreshes the access token once, however many uploads saw it rejected."""
+    async with token_lock:
+        if creds.token == rejected_token:
+            print("\nRefreshing access token...")
+            await asyncio.to_thread(creds.refresh, Request())
+
+def is_rate_limited(status, body):
+    """True for a 429, or a 403 whose error reason (from the Drive JSON error body) is a rate limit."""
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    try:
+        errors = json.loads(body)['error'].get('errors', [])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+    return any(isinstance(e, dict) and e.get('reason') in RATE_LIMIT_REASONS for e in errors)
+
+def auth_headers(token):
+    return {'Authorization': f'Bearer {token}'}
+
+async def read_upload_response(response):
+    """Returns (status, parsed JSON) on success, or (status, error text) on failure."""
+    if response.status >= 400:
+        return response.status, await response.text()
+    return response.status, await response.json()
+
+async def multipart_upload(session, token, local_path, mime_type, file_metadata):
+    """Uploads metadata and content in a single multipart/related request (small files)."""
+    params = {'uploadType': 'multipart', 'fields': 'id, name'}
+    with open(local_path, 'rb') as f:
+        # aiohttp streams a file part in small chunks read in its executor,
+        # so the body is never fully buffered and reads stay off the event loop
+        with aiohttp.MultipartWriter('related') as body:
+            body.append_json(file_metadata)
+            body.append(f, {'Content-Type': mime_type})
+        async with session.post(DRIVE_UPLOAD_URL, params=params, data=body, headers=auth_headers(token)) as response:
+            return await read_upload_response(response)
+
+async def resumable_upload(session, token, local_path, file_size, mime_type, file_metadata):
+    """Uploads through a resumable session in RESUMABLE_CHUNK_SIZE pieces (large files)."""
+    params = {'uploadType': 'resumable', 'fields': 'id, name'}
+    headers = {
+        **auth_headers(token),
+        'X-Upload-Content-Type': mime_type,
+        'X-Upload-Content-Length': str(file_size),
+    }
+    async with session.post(DRIVE_UPLOAD_URL, params=params, json=file_metadata, headers=headers) as response:
+        if response.status >= 400:
+            return response.status, await response.text()
+        session_url = response.headers['Location']
+
+    with open(local_path, 'rb') as f:
+        offset = 0
+        while True:
+            f.seek(offset)
+            chunk = await asyncio.to_thread(f.read, RESUMABLE_CHUNK_SIZE)
+            headers = {
+                **auth_headers(token),
+                'Content-Range': f"bytes {offset}-{offset + len(chunk) - 1}/{file_size}",
+            }
+            # 308 means "resume incomplete" here, not a redirect
+            async with session.put(session_url, data=chunk, headers=headers, allow_redirects=False) as response:
+                if response.status != 308:
+                    return await read_upload_response(response)
+                # Continue after the last byte Drive has stored (e.g. "bytes=0-8388607")
+                received = response.headers.get('Range')
+                offset = int(received.rsplit('-', 1)[1]) + 1 if received else 0
+
+async def upload_file_to_folder(session, creds, token_lock, local_path, parent_folder_id, file_id=None, mime_type=None, drive_filename=None):
+    """Uploads a single file to a specific Google Drive folder via the REST upload endpoint.
+
+    With a pre-generated file_id the create is idempotent: a retried upload can
+    only ever produce that one file, so transient failures are retried.
+    """
     file_name = drive_filename or os.path.basename(local_path)
-    mime_type, _ = mimetypes.guess_type(local_path)
     if mime_type is None:
-        mime_type = 'application/octet-stream'
+        mime_type = mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+
+    try:
+        file_size = os.path.getsize(local_path)
+    except FileNotFoundError:
+        print(f"Error: Local file not found: '{local_path}'")
+        return None
 
     file_metadata = {'name': file_name, 'parents': [parent_folder_id]}
-    media = MediaFileUpload(local_path, mimetype=mime_type, resumable=True)
+    if file_id:
+        file_metadata['id'] = file_id
+    max_retries = MAX_UPLOAD_RETRIES if file_id else 0
+
+    token_refreshed = False
+    retries = 0
+    while True:
+        try:
+            token = creds.token
+            # Small files skip the extra session-initiation round trip of a resumable upload
+            if file_size > RESUMABLE_THRESHOLD:
+                status, result = await resumable_upload(session, token, local_path, file_size, mime_type, file_metadata)
+            else:
+                status, result = await multipart_upload(session, token, local_path, mime_type, file_metadata)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            status, result = None, error # Network failure or timeout
+        except Exception as e:
+            print(f"\nAn unexpected error occurred uploading '{file_name}': {e}")
+            return None
+
+        if status == 401 and not token_refreshed:
+            token_refreshed = True
+            try:
+                await refresh_token(creds, token_lock, token)
+            except Exception as e:
+                print(f"\nError refreshing token while uploading '{file_name}': {e}")
+                return None
+            continue
+        if status == 409 and retries:
+            return file_id # An earlier attempt already created the file with this ID
+        transient = status is None or status >= 500 or is_rate_limited(status, result)
+        if transient and retries < max_retries:
+            await asyncio.sleep(2 ** retries) # Exponential backoff
+            retries += 1
+            continue
+        if status is None:
+            print(f"\nAn error occurred uploading '{file_name}': {result!r}")
+            return None
+        if status >= 400:
+            print(f"\nAn error occurred uploading '{file_name}': HTTP {status} {result}")
+            return None
+        return result.get('id')
+
+async def upload_files(creds, upload_jobs):
+    """Uploads (local_path, folder_id, file_id) jobs concurrently; returns (uploaded, failed) counts."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+    token_lock = asyncio.Lock()
+    upload_count = 0
+    upload_errors = 0
+
+    refresher = asyncio.create_task(keep_token_fresh(creds, token_lock))
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_UPLOADS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def bounded_upload(local_path, folder_id, file_id):
+            async with semaphore:
+                return await upload_file_to_folder(session, creds, token_lock, local_path, folder_id, file_id, VIDEO_MIME_TYPE)
+
+        tasks = [bounded_upload(*job) for job in upload_jobs]
+        with tqdm(total=len(tasks), desc="Uploading Videos", unit="file") as pbar:
+            for task in asyncio.as_completed(tasks):
+                if await task:
+                    upload_count += 1
+                else:
+                    upload_errors += 1
+                pbar.update(1) # Update progress bar for each file attempt
+
+    refresher.cancel()
+    return upload_count, upload_errors
+
+def prepare_split_uploads(creds, split_name, parent_split_folder_id, gloss_map):
+    """Ensures gloss folders exist in one split folder.
+
+    Returns (upload jobs, skipped count, already-uploaded count, names of files already in this split).
+
+    Runs in a worker thread, so it uses that thread's own Drive service.
+    """
+    upload_jobs = []
+    upload_errors = 0
+    already_uploaded = 0
+    video_dir_prefix = os.path.join(VIDEO_DIR, '') # Joined by concatenation per file below
 
     try:
-        # print(f"  Uploading '{file_name}' to folder ID {parent_folder_id}...")
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, name'
-        ).execute()
-        # print(f"  Successfully uploaded '{file.get('name')}' (ID: {file.get('id')})")
-        return file.get('id')
-    except HttpError as error:
-        print(f"\nAn error occurred uploading '{file_name}': {error}")
-        # Consider retries or logging failures here
-        return None
+        service = get_thread_service(creds)
     except Exception as e:
-        print(f"\nAn unexpected error occurred uploading '{file_name}': {e}")
-        return None
+        num_skipped = sum(len(v) for v in gloss_map.values())
+        print(f"Failed to build Drive service for split '{split_name}': {e}")
+        print(f"Skipping {num_skipped} files for split '{split_name}'.")
+        return upload_jobs, num_skipped, already_uploaded, set()
+
+    # One listing per split instead of a lookup query per gloss
+    existing_gloss_folders = list_child_folders(service, parent_split_folder_id)
+    if existing_gloss_folders is None:
+        num_skipped = sum(len(v) for v in gloss_map.values())
+        print(f"Skipping {num_skipped} files for split '{split_name}' due to folder listing error.")
+        return upload_jobs, num_skipped, already_uploaded, set()
+
+    # Sanitize gloss names for folder creation if necessary (e.g., replace slashes)
+    safe_gloss_names = {gloss: gloss.translate(GLOSS_NAME_TRANSLATION)
+                        for gloss, video_ids in gloss_map.items() if video_ids}
+
+    # Files already uploaded by an earlier run can only be in gloss folders that already existed
+    existing_drive_files, unlisted_folder_ids = list_files_batch(
+        service, [existing_gloss_folders[name] for name in set(safe_gloss_names.values()) if name in existing_gloss_folders])
+
+    # Create all missing gloss folders of this split in batched requests
+    missing_gloss_names = sorted({name for name in safe_gloss_names.values() if name not in existing_gloss_folders})
+    if missing_gloss_names:
+        existing_gloss_folders.update(create_folders_batch(service, missing_gloss_names, parent_split_folder_id))
+
+    for gloss, safe_gloss_name in safe_gloss_names.items():
+        video_ids = gloss_map[gloss]
+        gloss_folder_id = existing_gloss_folders.get(safe_gloss_name)
+        if not gloss_folder_id:
+            print(f"  Failed to get/create folder for gloss '{safe_gloss_name}' in {split_name}. Skipping {len(video_ids)} files.")
+            upload_errors += len(video_ids)
+            continue
+        if gloss_folder_id in unlisted_folder_ids:
+            # Unknown contents: uploading could duplicate files from an earlier run
+            print(f"  Could not check existing files for gloss '{safe_gloss_name}' in {split_name}. Skipping {len(video_ids)} files.")
+            upload_errors += len(video_ids)
+            continue
+
+        uploaded_names = existing_drive_files.get(gloss_folder_id, set())
+        for video_id in video_ids:
+            video_filename = f"{video_id}.mp4"
+            if video_filename in uploaded_names:
+                already_uploaded += 1
+                continue
+            local_file_path = video_dir_prefix + video_filename
+            upload_jobs.append((local_file_path, gloss_folder_id))
+
+    uploaded_in_split = set().union(*existing_drive_files.values())
+    return upload_jobs, upload_errors, already_uploaded, uploaded_in_split
 
 # --- Data Processing Functions ---
 
-def calculate_splits(total_items, train_r, val_r, test_r):
-    """Calculates the number of items for train, val, test splits."""
-    if total_items == 0:
-        return 0, 0, 0
-    if total_items == 1:
-        return 1, 0, 0 # Assign single item to train
-    if total_items == 2:
-        return 1, 1, 0 # Assign one to train, one to val
-
-    # Ensure ratios sum reasonably (adjust test if needed)
-    if train_r + val_r + test_r > 1.0:
-         print(f"Warning: Ratios sum to > 1.0 ({train_r + val_r + test_r}). Adjusting test ratio down.")
-         test_r = max(0, 1.0 - train_r - val_r)
-
-    n_train = math.floor(total_items * train_r)
-    n_val = math.floor(total_items * val_r)
-
-    # Adjust n_val slightly if train+val is too large due to flooring artifacts
-    # and there are enough items for test
-    if n_train + n_val >= total_items -1 and total_items > 2: # need at least 1 for test
-        n_val = max(0, total_items - n_train - 1) # Ensure at least 1 left for test
-
-    # Assign remaining to test, ensuring it's at least 0
-    n_test = max(0, total_items - n_train - n_val)
-
-    # Distribute any rounding remainder (usually 0 or 1 item)
-    # Prioritize train, then val, then test if sum is still less
-    remainder = total_items - (n_train + n_val + n_test)
-    if remainder > 0:
-       n_train += 1
-       remainder -= 1
-    if remainder > 0 and n_val > 0: # Add to val only if val is not zero
-        n_val += 1
-        remainder -=1
-    if remainder > 0: # Add any left over to test
-        n_test += 1
-
-
-    # Final sanity check
-    if n_train + n_val + n_test != total_items:
-       print(f"Error in split calculation! Total={total_items}, Split={n_train},{n_val},{n_test}. Sum={n_train+n_val+n_test}")
-       # Fallback: give all but one to train, one to val (if possible)
-       n_train = max(1, total_items -1) if total_items > 1 else total_items
-       n_val = 1 if total_items > 1 else 0
-       n_test = 0
+def calculate_splits(counts, train_r, val_r):
+    """Calculates train/val/test item counts for every gloss at once.
 
+    counts is an array of per-gloss totals; the test split takes whatever
+    train and val leave over, keeping at least one item when a gloss has
+    more than two. A single item goes to train; two go one each to train and val.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    n_train = np.floor(counts * train_r).astype(np.int64)
+    n_val = np.floor(counts * val_r).astype(np.int64)
+
+    # Leave at least one item for test
+    n_val = np.where(n_train + n_val >= counts - 1, np.maximum(0, counts - n_train - 1), n_val)
+
+    # Tiny glosses: 1 -> (1, 0, 0), 2 -> (1, 1, 0)
+    n_train = np.where(counts <= 2, np.minimum(counts, 1), n_train)
+    n_val = np.where(counts <= 2, counts - n_train, n_val)
+
+    n_test = counts - n_train - n_val
     return n_train, n_val, n_test
 
 
@@ -197,89 +578,87 @@ def main():
         print("Authentication failed. Exiting.")
         return
     try:
-        service = build("drive", "v3", credentials=creds)
+        service = build_drive_service(creds)
         print("Google Drive service created successfully.")
     except Exception as e:
         print(f"Failed to build Drive service: {e}")
         return
 
-    # 2. Load JSON Data
-    print(f"\nStep 2: Loading JSON data from {JSON_FILE}...")
-    try:
-        with open(JSON_FILE, 'r') as f:
-            wlasl_data = json.load(f)
-        print(f"Loaded {len(wlasl_data)} gloss entries.")
-    except FileNotFoundError:
-        print(f"Error: JSON file not found at {JSON_FILE}")
-        return
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from {JSON_FILE}")
-        return
-
-    # 3. Identify Existing Video Files
-    print(f"\nStep 3: Identifying existing video files in {VIDEO_DIR}...")
+    # 2. Identify Existing Video Files
+    print(f"\nStep 2: Identifying existing video files in {VIDEO_DIR}...")
     if not os.path.isdir(VIDEO_DIR):
         print(f"Error: Video directory not found at {VIDEO_DIR}")
         return
     try:
-        existing_videos = {f for f in os.listdir(VIDEO_DIR) if f.endswith('.mp4')}
-        print(f"Found {len(existing_videos)} .mp4 files locally.")
+        with os.scandir(VIDEO_DIR) as entries:
+            # Keyed by video id ("{video_id}.mp4" minus the extension)
+            existing_video_ids = {e.name[:-4] for e in entries if e.name.endswith('.mp4') and e.is_file(follow_symlinks=False)}
+        print(f"Found {len(existing_video_ids)} .mp4 files locally.")
     except OSError as e:
         print(f"Error accessing video directory {VIDEO_DIR}: {e}")
         return
 
-    # 4. Filter JSON and Group by Gloss (only existing videos)
-    print("\nStep 4: Filtering JSON data and grouping by gloss...")
+    # 3. Stream JSON, Filter and Group by Gloss (only existing videos)
+    # Gloss entries are parsed one at a time, so the full JSON is never held in memory
+    print(f"\nStep 3: Streaming JSON data from {JSON_FILE} and grouping by gloss...")
     gloss_to_existing_videos = defaultdict(list)
     total_instances_in_json = 0
     included_instances = 0
     missing_video_count = 0
 
-    for entry in tqdm(wlasl_data, desc="Processing Glosses"):
-        gloss = entry.get('gloss')
-        instances = entry.get('instances', [])
-        if not gloss or not instances:
-            continue
-
-        for instance in instances:
-            total_instances_in_json += 1
-            video_id = instance.get('video_id')
-            if not video_id:
+    try:
+        for entry in iter_json_items(JSON_FILE):
+            gloss = entry.get('gloss')
+            instances = entry.get('instances')
+            if not gloss or not instances:
                 continue
-
-            video_filename = f"{video_id}.mp4"
-            if video_filename in existing_videos:
-                gloss_to_existing_videos[gloss].append(video_filename)
-                included_instances += 1
-            else:
-                missing_video_count += 1
+            total_instances_in_json += len(instances)
+
+            # Collect into a local list with a pre-bound append; only glosses with videos get an entry
+            gloss_videos = []
+            append = gloss_videos.append
+            for instance in instances:
+                video_id = instance.get('video_id')
+                if not video_id:
+                    continue
+                if video_id in existing_video_ids:
+                    append(video_id)
+                else:
+                    missing_video_count += 1
+
+            if gloss_videos:
+                gloss_to_existing_videos[gloss].extend(gloss_videos)
+                included_instances += len(gloss_videos)
+    except FileNotFoundError:
+        print(f"Error: JSON file not found at {JSON_FILE}")
+        return
+    except JSON_DECODE_ERRORS:
+        print(f"Error: Could not decode JSON from {JSON_FILE}")
+        return
 
     print(f"Processed {total_instances_in_json} instances mentioned in JSON.")
     print(f"Found {included_instances} instances with corresponding video files.")
     print(f"{missing_video_count} instances skipped due to missing video files.")
     print(f"Data grouped for {len(gloss_to_existing_videos)} glosses with available videos.")
 
-    # 5. Split Data into Train/Val/Test
-    print("\nStep 5: Splitting data into TRAIN/VAL/TEST sets...")
+    # 4. Split Data into Train/Val/Test
+    print("\nStep 4: Splitting data into TRAIN/VAL/TEST sets...")
     split_data = {'TRAIN': defaultdict(list), 'VAL': defaultdict(list), 'TEST': defaultdict(list)}
-    total_files_to_upload = 0
-
-    for gloss, video_list in tqdm(gloss_to_existing_videos.items(), desc="Splitting Glosses"):
-        num_videos = len(video_list)
-        if num_videos == 0:
-            continue
 
-        # Shuffle for random assignment
-        random.shuffle(video_list)
+    gloss_items = [(gloss, video_list) for gloss, video_list in gloss_to_existing_videos.items() if video_list]
+    counts = np.fromiter((len(video_list) for _, video_list in gloss_items), dtype=np.int64, count=len(gloss_items))
+    n_trains, n_vals, _ = calculate_splits(counts, TRAIN_RATIO, VAL_RATIO)
+    rng = np.random.default_rng(SPLIT_SEED) # Seeded for reproducible splits
 
-        n_train, n_val, n_test = calculate_splits(num_videos, TRAIN_RATIO, VAL_RATIO, TEST_RATIO)
-        # print(f"  Gloss '{gloss}': {num_videos} videos -> Train={n_train}, Val={n_val}, Test={n_test}") # Debug print
+    for (gloss, video_list), n_train, n_val in zip(gloss_items, n_trains.tolist(), n_vals.tolist()):
+        # Random assignment via a permutation of positions (leaves video_list untouched)
+        shuffled = [video_list[i] for i in rng.permutation(len(video_list)).tolist()]
 
-        split_data['TRAIN'][gloss] = video_list[:n_train]
-        split_data['VAL'][gloss] = video_list[n_train : n_train + n_val]
-        split_data['TEST'][gloss] = video_list[n_train + n_val :]
+        split_data['TRAIN'][gloss] = shuffled[:n_train]
+        split_data['VAL'][gloss] = shuffled[n_train : n_train + n_val]
+        split_data['TEST'][gloss] = shuffled[n_train + n_val :]
 
-        total_files_to_upload += num_videos
+    total_files_to_upload = int(counts.sum())
 
     print(f"Data split complete. Total files to potentially upload: {total_files_to_upload}")
     print(f"  Train set: {sum(len(v) for v in split_data['TRAIN'].values())} files across {len(split_data['TRAIN'])} glosses")
@@ -287,71 +666,88 @@ def main():
     print(f"  Test set:  {sum(len(v) for v in split_data['TEST'].values())} files across {len(split_data['TEST'])} glosses")
 
 
-    # 6. Create Google Drive Folders and Upload
-    print(f"\nStep 6: Creating Google Drive folder structure under '{DRIVE_BASE_FOLDER_NAME}' and uploading files...")
+    # 5. Create Google Drive Folders and Upload
+    print(f"\nStep 5: Creating Google Drive folder structure under '{DRIVE_BASE_FOLDER_NAME}' and uploading files...")
 
     # Get/Create Base Folder
-    base_folder_id = get_or_create_folder(service, DRIVE_BASE_FOLDER_NAME, parent_id='root') # Create in root
-    if not base_folder_id:
-        print("Failed to get or create base folder. Exiting.")
+    try:
+        base_folder_id = find_folder(service, DRIVE_BASE_FOLDER_NAME, parent_id='root')
+    except Exception as e:
+        print(f"An error occurred finding folder '{DRIVE_BASE_FOLDER_NAME}': {e}")
         return
+    if base_folder_id:
+        print(f"Found existing folder: '{DRIVE_BASE_FOLDER_NAME}' (ID: {base_folder_id})")
+        # One listing of the base folder instead of a lookup query per split
+        existing_split_folders = list_child_folders(service, base_folder_id)
+        if existing_split_folders is None:
+            print("Failed to list split folders. Exiting.")
+            return
+    else:
+        base_folder_id = create_folder(service, DRIVE_BASE_FOLDER_NAME, parent_id='root') # Create in root
+        if not base_folder_id:
+            print("Failed to create base folder. Exiting.")
+            return
+        existing_split_folders = {} # A new base folder has nothing to look up
 
     # Get/Create Split Folders
     split_folder_ids = {}
     for split_name in SPLIT_NAMES:
-        folder_id = get_or_create_folder(service, split_name, parent_id=base_folder_id)
+        folder_id = existing_split_folders.get(split_name) or create_folder(service, split_name, parent_id=base_folder_id)
         if not folder_id:
             print(f"Failed to get or create {split_name} folder. Skipping this split.")
             continue
         split_folder_ids[split_name] = folder_id
 
-    # Iterate through splits, glosses, and files to upload
-    upload_count = 0
+    # Prepare gloss folders for all splits in parallel, queueing files to upload
+    upload_jobs = []
     upload_errors = 0
-    with tqdm(total=total_files_to_upload, desc="Uploading Videos", unit="file") as pbar:
-        for split_name, gloss_map in split_data.items():
-            if split_name not in split_folder_ids:
-                num_skipped = sum(len(v) for v in gloss_map.values())
-                print(f"Skipping {num_skipped} files for split '{split_name}' due to folder creation error.")
-                pbar.update(num_skipped)
-                continue
-
-            parent_split_folder_id = split_folder_ids[split_name]
-            # print(f"\nProcessing {split_name} split...")
-
-            for gloss, video_filenames in gloss_map.items():
-                if not video_filenames: # Skip if a gloss ended up with 0 videos in this split
-                    continue
-
-                # Sanitize gloss name for folder creation if necessary (e.g., replace slashes)
-                safe_gloss_name = gloss.replace('/', '_').replace('\\', '_') # Basic sanitization
-
-                # Get/Create Gloss Folder inside the split folder
-                gloss_folder_id = get_or_create_folder(service, safe_gloss_name, parent_id=parent_split_folder_id)
-                if not gloss_folder_id:
-                    print(f"  Failed to get/create folder for gloss '{safe_gloss_name}' in {split_name}. Skipping {len(video_filenames)} files.")
-                    pbar.update(len(video_filenames))
-                    upload_errors += len(video_filenames)
-                    continue
-
-                # print(f"  Uploading {len(video_filenames)} videos for gloss '{gloss}' to {split_name}/{safe_gloss_name}...")
-                for video_filename in video_filenames:
-                    local_file_path = os.path.join(VIDEO_DIR, video_filename)
-                    uploaded_id = upload_file_to_folder(service, local_file_path, gloss_folder_id)
-                    if uploaded_id:
-                        upload_count += 1
-                    else:
-                        upload_errors += 1
-                    pbar.update(1) # Update progress bar for each file attempt
+    already_uploaded = 0
+    uploaded_anywhere = set() # File names found in any split's gloss folders
+    for split_name, gloss_map in split_data.items():
+        if split_name not in split_folder_ids:
+            num_skipped = sum(len(v) for v in gloss_map.values())
+            print(f"Skipping {num_skipped} files for split '{split_name}' due to folder creation error.")
+
+    with ThreadPoolExecutor(max_workers=len(split_folder_ids) or 1) as executor:
+        futures = [
+            executor.submit(prepare_split_uploads, creds, split_name, split_folder_ids[split_name], gloss_map)
+            for split_name, gloss_map in split_data.items() if split_name in split_folder_ids
+        ]
+        for future in futures:
+            split_jobs, split_errors, split_already_uploaded, split_uploaded_names = future.result()
+            upload_jobs.extend(split_jobs)
+            upload_errors += split_errors
+            already_uploaded += split_already_uploaded
+            uploaded_anywhere.update(split_uploaded_names)
+
+    # A video an earlier run put in a different split (e.g. under another SPLIT_SEED) must not
+    # be uploaded again, or the same clip would end up in two splits
+    num_jobs = len(upload_jobs)
+    upload_jobs = [job for job in upload_jobs if os.path.basename(job[0]) not in uploaded_anywhere]
+    if len(upload_jobs) < num_jobs:
+        print(f"Skipping {num_jobs - len(upload_jobs)} files already uploaded to a different split.")
+        already_uploaded += num_jobs - len(upload_jobs)
+    if already_uploaded:
+        print(f"Skipping {already_uploaded} files already present in Drive.")
+
+    # Pre-generated IDs make each upload an idempotent create, so failed attempts can be retried safely
+    file_ids = generate_file_ids(service, len(upload_jobs))
+    if len(file_ids) < len(upload_jobs):
+        print(f"Warning: Only generated {len(file_ids)} of {len(upload_jobs)} file IDs; the rest are uploaded without retries.")
+    file_ids.extend([None] * (len(upload_jobs) - len(file_ids)))
+    upload_jobs = [(local_path, folder_id, file_id) for (local_path, folder_id), file_id in zip(upload_jobs, file_ids)]
+
+    # Upload all queued files concurrently
+    upload_count, failed_uploads = asyncio.run(upload_files(creds, upload_jobs))
+    upload_errors += failed_uploads
 
     print("\n--- Upload Summary ---")
     print(f"Attempted to upload: {total_files_to_upload} files")
     print(f"Successfully uploaded: {upload_count} files")
+    print(f"Already in Drive: {already_uploaded} files")
     print(f"Upload errors/skips: {upload_errors} files")
     print("--- Script finished ---")
 
 
 if __name__ == "__main__":
-    # Set random seed for reproducibility of splits (optional)
-    random.seed(42)
-    main()
\ No newline at end of file
+    main()